@@ -1,3 +1,4 @@
+from itertools import count
 from math import sqrt
 import random
 import pygame as pg
@@ -35,6 +36,13 @@ FONT = pg.font.Font(FONT_FILE, FONT_SIZE)
 VELOCITY_LINE_COLOR = SETTINGS["other_visuals"]["VELOCITY_LINE_COLOR"]
 VELOCITY_LINE_THICKNESS = SETTINGS["other_visuals"]["VELOCITY_LINE_THICKNESS"]
 
+# gives each Body a unique id so it can be recognized even after other Bodies get removed
+body_ids = count()
+
+# images that have already been loaded for Body icons, so each file is only read once
+# instead of every time a Body's surface is remade
+loaded_icons = {}
+
 class Trail:
     '''
     a visual trail of an object's movement. basically a series of lines with
@@ -87,11 +95,17 @@ class Body:
         self.accel = Vector(0, 0)
         self.status = status
         self.icon = random.choice(BODY_ICON_SET)
+        self.uid = next(body_ids)
 
         # assumes each Body is made from the same material at a specific density so that
         # each kg of mass corresponds to a certain amount of surface area of the Body
         # Since radius and surface area are intertwined, the mass of the Body affects its radius
-        self.update_surf(0.1)
+        self.dia = sqrt(self.mass) * SIZE_CONST
+
+        # the surface isn't made until the Body is actually drawn in the window, bc
+        # making one for every Body in a big scene takes forever
+        self.surf = None
+        self.surf_zoom = None # zoom that self.surf was made for
 
         self.trail = Trail(TRAIL_LEN, TRAIL_COLOR, TRAIL_START_WIDTH, TRAIL_END_WIDTH)
 
@@ -132,10 +146,12 @@ class Body:
 
         # diameter in window, adjusted for zoom
         wdw_dia = self.dia * zoom
+        self.surf_zoom = zoom
 
         if type(self.icon) is str: # assume its an image file
-            self.surf = pg.image.load(self.icon)
-            self.surf = pg.transform.scale(self.surf, (wdw_dia, wdw_dia))
+            if self.icon not in loaded_icons:
+                loaded_icons[self.icon] = pg.image.load(self.icon)
+            self.surf = pg.transform.scale(loaded_icons[self.icon], (wdw_dia, wdw_dia))
         else: # assuming its an rgb triplet
             self.surf = pg.surface.Surface((wdw_dia, wdw_dia), pg.SRCALPHA)
             pg.draw.circle(self.surf, self.icon, (wdw_dia/2, wdw_dia/2), wdw_dia/2)
@@ -149,8 +165,12 @@ class Body:
 
         wdw_pos = window.world_to_window(self.pos)
 
-        # draws the Body, regardless of its status
-        surf.blit(self.surf, center_surf(self.surf, wdw_pos.components()))
+        # draws the Body, regardless of its status, but only if it can be seen in the window
+        if window.on_screen(wdw_pos, self.dia * window.zoom_amt / 2):
+            # (re)make the surface if it hasn't been made yet or the zoom changed since
+            if self.surf is None or self.surf_zoom != window.zoom_amt:
+                self.update_surf(window.zoom_amt)
+            surf.blit(self.surf, center_surf(self.surf, wdw_pos.components()))
 
         # draw velocity and accel vectors if disp_vects is true
         if disp_vects:
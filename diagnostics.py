@@ -0,0 +1,150 @@
+from collections import deque
+
+from vector import Vector
+
+class Sample:
+    '''
+    snapshot of the conserved quantities of a World at the start of one step
+
+    momentum is a Vector, angular momentum is a float bc in 2D it only points in or out
+    of the screen, and it is taken about the world origin. drifts are relative to the
+    baseline sample of the Monitor that recorded this, plus whatever drift was carried over
+    from before that baseline. relative energy drift is divided by the current baseline's energy
+
+    rebased is True if the baseline was moved to this sample bc the number of bodies changed,
+    so callers can tell that apart from there just not being any drift
+    '''
+    def __init__(self, step_num:int, sim_time:float, num_bodies:int, kinetic:float, potential:float,
+                 momentum:Vector, ang_momentum:float, baseline:"Sample"=None, carried:"Sample"=None,
+                 rebased:bool=False):
+        self.step_num = step_num
+        self.sim_time = sim_time
+        self.num_bodies = num_bodies
+        self.kinetic = kinetic
+        self.potential = potential
+        self.momentum = momentum
+        self.ang_momentum = ang_momentum
+        self.rebased = rebased
+
+        if baseline is None:
+            baseline = self
+
+        self.energy_drift = self.total_energy - baseline.total_energy
+        self.momentum_drift_vect = self.momentum - baseline.momentum
+        self.ang_momentum_drift = self.ang_momentum - baseline.ang_momentum
+
+        # drift from before the baseline was last moved
+        if carried is not None:
+            self.energy_drift += carried.energy_drift
+            self.momentum_drift_vect += carried.momentum_drift_vect
+            self.ang_momentum_drift += carried.ang_momentum_drift
+
+        self.momentum_drift = self.momentum_drift_vect.magnitude
+
+        # relative drift is more useful for comparing timesteps, but blows up when
+        # the baseline energy is 0, so that case just reports the absolute drift
+        if baseline.total_energy != 0:
+            self.rel_energy_drift = self.energy_drift / abs(baseline.total_energy)
+        else:
+            self.rel_energy_drift = self.energy_drift
+
+    @property
+    def total_energy(self):
+        return self.kinetic + self.potential
+
+    def __str__(self):
+        return f"Step: {self.step_num}\tKE: {self.kinetic:.4g}\tPE: {self.potential:.4g}\t" \
+            f"E: {self.total_energy:.4g}\tdE/E0: {self.rel_energy_drift:.3e}\t" \
+            f"dP: {self.momentum_drift:.3e}\tdL: {self.ang_momentum_drift:.3e}" + \
+            ("\t(rebased)" if self.rebased else "")
+
+class Monitor:
+    '''
+    records conservation diagnostics (energy, momentum, angular momentum) of a World
+
+    the World hands over the potential energy it already added up during its gravity
+    pass, so recording a sample only costs one extra loop over the bodies instead of
+    another loop over every pair of them. sample_every lets that loop be skipped on
+    most steps too
+    '''
+    def __init__(self, sample_every:int=1, history_len:int=1000):
+        '''
+        sample_every is how many steps there are between samples, and history_len is
+        how many of the most recent samples are kept around
+        '''
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+
+        self.sample_every = sample_every
+        self.history = deque(maxlen=history_len)
+        self.baseline = None # the sample that drifts are measured from
+        self.carried = None # last sample before the baseline was moved, whose drift is carried over
+        self.step_num = 0
+        self.sim_time = 0
+
+    @property
+    def latest(self):
+        '''most recent Sample, or None if nothing has been recorded yet'''
+        return self.history[-1] if self.history else None
+
+    def is_sample_step(self) -> bool:
+        '''returns if the current step should be sampled'''
+        return self.step_num % self.sample_every == 0
+
+    def record(self, bodies:list, potential:float) -> Sample:
+        '''
+        makes a Sample from a list of Bodies and the potential energy between them
+
+        Bodies still being placed by the user (statuses "M" and "V") don't feel or exert
+        gravity, so they're left out here too
+        '''
+        kinetic = 0
+        momentum_x = momentum_y = 0
+        ang_momentum = 0
+        num_bodies = 0
+
+        for body in bodies:
+            if body.status in ["M", "V"]:
+                continue
+
+            num_bodies += 1
+            vel = body.velocity
+            kinetic += body.mass * vel.dot(vel) / 2
+            momentum_x += body.mass * vel.x
+            momentum_y += body.mass * vel.y
+            ang_momentum += body.mass * (body.pos.x * vel.y - body.pos.y * vel.x)
+
+        # the totals jump whenever a body is added or removed, which isn't drift, so the
+        # baseline is moved to this sample and the drift measured up to the last one is kept.
+        # any drift between the last sample and the change isn't counted
+        rebased = self.baseline is not None and self.baseline.num_bodies != num_bodies
+        if rebased:
+            self.carried = self.latest
+            self.baseline = None
+
+        sample = Sample(self.step_num, self.sim_time, num_bodies, kinetic, potential,
+                        Vector(momentum_x, momentum_y), ang_momentum, self.baseline, self.carried,
+                        rebased)
+
+        if self.baseline is None:
+            self.baseline = sample
+
+        self.history.append(sample)
+        return sample
+
+    def advance(self, delta_time:float):
+        '''moves the step counter and simulation clock forward by one step'''
+        self.step_num += 1
+        self.sim_time += delta_time
+
+    def reset_baseline(self):
+        '''
+        makes the next recorded sample the new baseline for drifts and throws away the
+        drift measured so far
+
+        the baseline already moves on its own when the number of active bodies changes (keeping
+        the drift), but this is needed when the bodies are changed some other way (ex: their
+        velocities are set)
+        '''
+        self.baseline = None
+        self.carried = None
@@ -8,12 +8,16 @@ anywhere on the screen. The line shown while setting the object's velocity shows
 direction, and its length shows its speed.
 '''
 from math import sin, cos, pi
+import sys
 import pygame as pg
 
 from vector import Vector
 from bodies import Body
 from world import World
 from window import Window
+import scenarios
+from worker import PhysicsProcess
+import telemetry
 
 from settings import SETTINGS
 
@@ -30,6 +34,19 @@ BACKGROUND_IMG = SETTINGS["window"]["BACKGROUND_IMG"]
 ZOOM_INCREMENT = SETTINGS["window"]["ZOOM_INCREMENT"]
 PAN_INCREMENT = SETTINGS["window"]["PAN_INCREMENT"]
 
+SAMPLE_EVERY = SETTINGS["diagnostics"]["SAMPLE_EVERY"]
+HISTORY_LEN = SETTINGS["diagnostics"]["HISTORY_LEN"]
+
+SCENARIO_FILE = SETTINGS["scenario"]["SCENARIO_FILE"]
+
+USE_WORKER = SETTINGS["worker"]["USE_WORKER"]
+PHYSICS_FPS = SETTINGS["worker"]["PHYSICS_FPS"]
+CAPACITY = SETTINGS["worker"]["CAPACITY"]
+
+TELEMETRY_SINK = SETTINGS["telemetry"]["SINK"]
+TELEMETRY_EVERY = SETTINGS["telemetry"]["EVERY"]
+TELEMETRY_QUEUE_LEN = SETTINGS["telemetry"]["QUEUE_LEN"]
+
 def on_event(event:pg.event.Event):
     '''
     A function that performs a specific action for specific events inputted
@@ -42,12 +59,16 @@ def on_event(event:pg.event.Event):
         return
 
     if event.type == pg.MOUSEWHEEL:
-        window.zoom(event.y * ZOOM_INCREMENT, world)
+        window.zoom(event.y * ZOOM_INCREMENT)
         return
     
     if event.type == pg.KEYDOWN:
         if event.unicode == "v":
             disp_vects = not disp_vects # toggle displaying velocity and acceleration vectors
+        elif event.unicode == "e" and world.diagnostics is not None:
+            # print latest energy and momentum diagnostics, to stderr so it doesn't get mixed
+            # into telemetry when that's going to stdout
+            print(world.diagnostics, file=sys.stderr)
         return
 
     # if world.bodies isn't populated, this should only check for a mouse click
@@ -117,26 +138,34 @@ def simulate():
     actually simulates the motion of the Objs, manages keyboard and mouse input
     and displays everything
     '''
-    while running:
-        # delta_time is time passed between last and current frame in seconds
-        # clock.tick() also limits the frames per second the simulation runs at
-        delta_time = clock.tick(FPS) / 1000
-
-        # responds to events that occur during the simulation
-        for event in pg.event.get():
-            on_event(event)
-
-        # TODO: move this somewhere better
-        manage_keyboard_input()
-
-        # calculate motion of the Objs
-        world.step(delta_time)
-
-        # and then display them on the screen
-        world.display(screen, background, window, disp_vects)
-
-    # quit pygame when the simulation is no longer running
-    pg.quit()
+    # try/finally so pygame and the worker still get shut down if something fails,
+    # like the worker process dying
+    try:
+        while running:
+            # delta_time is time passed between last and current frame in seconds
+            # clock.tick() also limits the frames per second the simulation runs at
+            delta_time = clock.tick(FPS) / 1000
+
+            # responds to events that occur during the simulation
+            for event in pg.event.get():
+                on_event(event)
+
+            # TODO: move this somewhere better
+            manage_keyboard_input()
+
+            # calculate motion of the Objs, unless the worker process is already doing that
+            if not USE_WORKER:
+                world.step(delta_time)
+
+            # and then display them on the screen
+            world.display(screen, background, window, disp_vects)
+    finally:
+        # quit pygame and the worker when the simulation is no longer running
+        pg.quit()
+        if USE_WORKER:
+            world.stop()
+        else:
+            world.disable_export()
 
 # TODO: mabye move this to some diff module, mabye called goofy gimmicks idk 
 def create_obj_circle(num:int, radius:int, center:tuple, mass:int=200, spd:float=0, state:str="F"):
@@ -161,7 +190,25 @@ if __name__ == "__main__":
     background = pg.image.load(BACKGROUND_IMG)
     background = pg.transform.scale(background, SCREEN_SIZE)
 
-    world = World() # creates a world of Objs that can be used to simulate gravity
+    if USE_WORKER:
+        # the worker loads the scenario itself, but the shared memory has to fit it
+        capacity = CAPACITY
+        if SCENARIO_FILE:
+            with open(SCENARIO_FILE, "rb") as file:
+                capacity += scenarios.read_header(file)["num_bodies"]
+
+        # world that runs in a separate process, which can be used like a World
+        world = PhysicsProcess(capacity, PHYSICS_FPS, SCENARIO_FILE, SAMPLE_EVERY, HISTORY_LEN,
+                               TELEMETRY_SINK, TELEMETRY_EVERY, TELEMETRY_QUEUE_LEN)
+        world.start()
+    else:
+        world = World() # creates a world of Objs that can be used to simulate gravity
+        if SAMPLE_EVERY > 0:
+            world.enable_diagnostics(SAMPLE_EVERY, HISTORY_LEN)
+        if SCENARIO_FILE:
+            scenarios.load(SCENARIO_FILE, world)
+        if TELEMETRY_SINK:
+            world.enable_export(telemetry.make_sink(TELEMETRY_SINK), TELEMETRY_EVERY, TELEMETRY_QUEUE_LEN)
     window = Window() # create window to manage zoom, panning, and coordinate conversion
 
     clock = pg.time.Clock() # sets up the clock so time can be used for calculations
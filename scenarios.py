@@ -0,0 +1,337 @@
+'''
+scenario files for saving and loading big scenes of Bodies, plus seeded generators
+for making some common ones
+
+A scenario file is laid out like this:
+    - the 8 byte magic string b"GRAVSCN1"
+    - a little endian uint32 with the length of the JSON header, then the header itself,
+      which has the scenario's name, num of bodies, and whatever generator made it
+    - the bodies, split up into blocks. each block starts with a uint32 count of the bodies
+      in it, then has a column of that many little endian float64s for each of mass, x, y,
+      velocity x, and velocity y, and then a column of that many status bytes (ex: b"O")
+
+the blocks are there so a file can be loaded a chunk at a time without reading the whole
+thing into memory first, and the columns are there so each one can be read in one go
+'''
+from array import array
+from math import sqrt, sin, cos, pi
+import gc
+import json
+import random
+import struct
+import sys
+
+from vector import Vector
+from bodies import Body
+
+from settings import SETTINGS
+
+GRAV_CONST = SETTINGS["physics"]["GRAV_CONST"]
+
+MAGIC = b"GRAVSCN1"
+VERSION = 1
+BLOCK_SIZE = 65536 # max num of bodies in each block when saving
+FLOAT_COLUMNS = ["mass", "x", "y", "vx", "vy"]
+
+class BodyColumns:
+    '''
+    Body data stored as columns instead of as Body objects, used for generating,
+    saving, and loading scenarios without making a Body for each one
+
+    the float columns are arrays of doubles and status is a bytes-like object with
+    one status char per body
+    '''
+    def __init__(self, mass=None, x=None, y=None, vx=None, vy=None, status=None):
+        self.mass = array("d") if mass is None else mass
+        self.x = array("d") if x is None else x
+        self.y = array("d") if y is None else y
+        self.vx = array("d") if vx is None else vx
+        self.vy = array("d") if vy is None else vy
+        self.status = bytearray() if status is None else status
+
+    def __len__(self):
+        return len(self.mass)
+
+    def append(self, mass:float, x:float, y:float, vx:float, vy:float, status:str="O"):
+        '''adds one body to the end of the columns'''
+        self.mass.append(mass)
+        self.x.append(x)
+        self.y.append(y)
+        self.vx.append(vx)
+        self.vy.append(vy)
+        self.status += status.encode("ascii")
+
+    def to_bodies(self) -> list:
+        '''makes a list of Bodies out of the columns'''
+        status = self.status.decode("ascii")
+        return [Body(mass, Vector(x, y), Vector(vx, vy), stat)
+                for mass, x, y, vx, vy, stat in zip(self.mass, self.x, self.y, self.vx, self.vy, status)]
+
+def save(file_path:str, columns:BodyColumns, name:str="", generator:dict=None):
+    '''
+    saves bodies to a scenario file
+
+    generator is an optional dict describing how the bodies were made (ex: the output
+    of one of the generators below), which is stored in the header for reference
+    '''
+    header = {
+        "version": VERSION,
+        "name": name,
+        "num_bodies": len(columns),
+        "generator": generator
+    }
+    header_raw = json.dumps(header).encode("utf-8")
+
+    with open(file_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<I", len(header_raw)))
+        file.write(header_raw)
+
+        for start in range(0, len(columns), BLOCK_SIZE):
+            end = min(start + BLOCK_SIZE, len(columns))
+            file.write(struct.pack("<I", end - start))
+
+            for col_name in FLOAT_COLUMNS:
+                block = getattr(columns, col_name)[start:end]
+                # the file is always little endian
+                if sys.byteorder == "big":
+                    block.byteswap()
+                file.write(block.tobytes())
+
+            file.write(bytes(columns.status[start:end]))
+
+def read_header(file) -> dict:
+    '''
+    reads and returns the header of an open scenario file, leaving the file at the first block
+
+    raises a ValueError if it isn't a scenario file or the file ends before the header does
+    '''
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a scenario file")
+
+    header_len_raw = file.read(4)
+    if len(header_len_raw) != 4:
+        raise ValueError("truncated scenario file")
+    header_len, = struct.unpack("<I", header_len_raw)
+
+    header_raw = file.read(header_len)
+    if len(header_raw) != header_len:
+        raise ValueError("truncated scenario file")
+    header = json.loads(header_raw.decode("utf-8"))
+
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported scenario version {header['version']}")
+
+    return header
+
+def iter_blocks(file):
+    '''
+    generator that yields the bodies in an open scenario file one block at a time
+    as BodyColumns, so the whole file is never in memory at once
+
+    the header has to have been read already with read_header. raises a ValueError if
+    the file ends in the middle of a block
+    '''
+    while True:
+        count_raw = file.read(4)
+        if not count_raw:
+            break
+        if len(count_raw) != 4:
+            raise ValueError("truncated scenario file")
+        count, = struct.unpack("<I", count_raw)
+
+        columns = []
+        for _ in FLOAT_COLUMNS:
+            column = array("d")
+            column_raw = file.read(count * column.itemsize)
+            if len(column_raw) != count * column.itemsize:
+                raise ValueError("truncated scenario file")
+
+            column.frombytes(column_raw)
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+
+        status = file.read(count)
+        if len(status) != count:
+            raise ValueError("truncated scenario file")
+
+        yield BodyColumns(*columns, status=status)
+
+def load(file_path:str, world:"World") -> dict: # type: ignore
+    '''
+    loads the bodies in a scenario file into a World a block at a time and
+    returns the file's header
+
+    raises a ValueError if the file is truncated or doesn't have as many bodies as its header
+    says, in which case none of its bodies are left in the World
+    '''
+    # making millions of Bodies keeps setting off the garbage collector, which checks every
+    # object each time and ends up taking most of the load time, so its paused while loading
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+
+    start_len = len(world.bodies)
+
+    try:
+        with open(file_path, "rb") as file:
+            header = read_header(file)
+
+            for block in iter_blocks(file):
+                world.add_bodies(block.to_bodies())
+
+        num_loaded = len(world.bodies) - start_len
+        if num_loaded != header["num_bodies"]:
+            raise ValueError(f"scenario file has {num_loaded} bodies but its header says {header['num_bodies']}")
+    except ValueError:
+        del world.bodies[start_len:]
+        raise
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return header
+
+# the generators below all take a seed so the same scene comes out every time, and return
+# the BodyColumns they made along with a dict of what they were called with, which can be
+# passed straight to save() as the generator
+
+def ring(num:int, radius:float, center:tuple=(0, 0), mass:float=200, spd:float=0, status:str="F",
+         jitter:float=0, seed:int=0) -> tuple:
+    '''
+    a ring of num bodies with a certain radius and mass, with a velocity perpendicular to the
+    radius of the ring. same as create_obj_circle in main.py, except each body's distance from
+    the center can be randomly moved by up to jitter
+    '''
+    rng = random.Random(seed)
+    columns = BodyColumns()
+
+    for i in range(num):
+        angle = i * 2 * pi / num # angle of the body in radians
+        dist = radius + rng.uniform(-jitter, jitter)
+        columns.append(mass, center[0] + dist * cos(angle), center[1] + dist * sin(angle),
+                       spd * -sin(angle), spd * cos(angle), status)
+
+    return columns, {"type": "ring", "num": num, "radius": radius, "center": list(center), "mass": mass,
+                     "spd": spd, "status": status, "jitter": jitter, "seed": seed}
+
+def disk(num:int, radius:float, center:tuple=(0, 0), mass:float=20, central_mass:float=0,
+         seed:int=0) -> tuple:
+    '''
+    a flat disk of num bodies spread evenly over its area, each moving counterclockwise at the
+    speed of a circular orbit around the mass inside it
+
+    if central_mass is above 0, a fixed body of that mass is put at the center first
+    '''
+    rng = random.Random(seed)
+    columns = BodyColumns()
+    disk_mass = num * mass
+
+    if central_mass > 0:
+        columns.append(central_mass, center[0], center[1], 0, 0, "F")
+
+    for _ in range(num):
+        # sqrt bc the area of a disk grows with the square of its radius
+        dist = radius * sqrt(rng.random())
+        angle = rng.uniform(0, 2 * pi)
+
+        # mass inside a disk is proportional to its area too
+        inner_mass = central_mass + disk_mass * (dist / radius)**2
+        spd = sqrt(GRAV_CONST * inner_mass / dist) if dist > 0 else 0
+
+        columns.append(mass, center[0] + dist * cos(angle), center[1] + dist * sin(angle),
+                       spd * -sin(angle), spd * cos(angle))
+
+    return columns, {"type": "disk", "num": num, "radius": radius, "center": list(center), "mass": mass,
+                     "central_mass": central_mass, "seed": seed}
+
+def plummer(num:int, scale_radius:float, center:tuple=(0, 0), mass:float=20, max_radius:float=None,
+            seed:int=0) -> tuple:
+    '''
+    a Plummer sphere of num bodies flattened onto the 2D plane
+
+    positions and velocities are sampled in 3D the usual way (Aarseth, Henon, and Wielen 1974)
+    and then the z components are just dropped. bodies further than max_radius from the center
+    (10 scale radii by default) are resampled so there aren't any strays way out of bounds
+    '''
+    rng = random.Random(seed)
+    columns = BodyColumns()
+    total_mass = num * mass
+
+    if max_radius is None:
+        max_radius = 10 * scale_radius
+
+    for _ in range(num):
+        dist = max_radius + 1
+        while dist > max_radius:
+            # 1 - random() instead of random() so 0 isn't raised to a negative power, but that
+            # means it can be 1, which makes the denominator 0, so that gets resampled too
+            denominator = (1 - rng.random())**(-2/3) - 1
+            if denominator > 0:
+                dist = scale_radius / sqrt(denominator)
+
+        x, y = random_direction(rng, dist)
+
+        # picks speed as a fraction of escape speed using rejection sampling
+        frac, prob = 0, 0.1
+        while prob > frac**2 * (1 - frac**2)**3.5:
+            frac, prob = rng.random(), rng.random() * 0.1
+        spd = frac * sqrt(2 * GRAV_CONST * total_mass) * (dist**2 + scale_radius**2)**-0.25
+
+        vx, vy = random_direction(rng, spd)
+
+        columns.append(mass, center[0] + x, center[1] + y, vx, vy)
+
+    return columns, {"type": "plummer", "num": num, "scale_radius": scale_radius, "center": list(center),
+                     "mass": mass, "max_radius": max_radius, "seed": seed}
+
+def uniform_cloud(num:int, width:float, height:float, center:tuple=(0, 0), mass:float=20,
+                  max_spd:float=0, seed:int=0) -> tuple:
+    '''
+    num bodies spread evenly over a rectangle, each moving in a random direction at a
+    random speed up to max_spd
+    '''
+    rng = random.Random(seed)
+    columns = BodyColumns()
+
+    for _ in range(num):
+        x = center[0] + rng.uniform(-width / 2, width / 2)
+        y = center[1] + rng.uniform(-height / 2, height / 2)
+        spd = rng.uniform(0, max_spd)
+        angle = rng.uniform(0, 2 * pi)
+        columns.append(mass, x, y, spd * cos(angle), spd * sin(angle))
+
+    return columns, {"type": "uniform_cloud", "num": num, "width": width, "height": height,
+                     "center": list(center), "mass": mass, "max_spd": max_spd, "seed": seed}
+
+GENERATORS = {
+    "ring": ring,
+    "disk": disk,
+    "plummer": plummer,
+    "uniform_cloud": uniform_cloud
+}
+
+def generate(generator:dict) -> tuple:
+    '''
+    runs a generator from a dict like the ones the generators return, with "type" being
+    the name of the generator and everything else being its arguments
+    '''
+    args = dict(generator)
+    return GENERATORS[args.pop("type")](**args)
+
+def random_direction(rng:random.Random, length:float) -> tuple:
+    '''
+    x and y components of a 3D vector with a certain length pointing in a random
+    direction, with the z component dropped
+    '''
+    z = rng.uniform(-1, 1)
+    angle = rng.uniform(0, 2 * pi)
+    planar = length * sqrt(1 - z**2)
+    return planar * cos(angle), planar * sin(angle)
+
+if __name__ == "__main__":
+    # makes a scenario file from the command line, ex:
+    # python scenarios.py plummer.scn '{"type": "plummer", "num": 1000000, "scale_radius": 150}'
+    out_path, generator = sys.argv[1], json.loads(sys.argv[2])
+    columns, generator = generate(generator)
+    save(out_path, columns, generator["type"], generator)
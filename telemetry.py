@@ -0,0 +1,270 @@
+'''
+streams the state of a World and the events that happen in it (collisions and bodies
+being removed) to a sink like a file, stdout, or a local socket, as JSON lines
+
+Each line is one record with a "type":
+    - "step": the state of every Body after a step, as [uid, mass, x, y, vx, vy, status]
+    - "collision": the uids of 2 Bodies that collided during a step
+    - "removed": the uid and position of a Body that went out of bounds during a step
+    - "dropped": how many records were thrown away bc the sink couldn't keep up
+
+records are handed to a thread that encodes and writes them in batches, so the physics
+loop never waits on the sink. if the sink is too slow or stops working, records are dropped
+instead of blocking
+'''
+from collections import deque
+import json
+import socket
+import sys
+import threading
+import time
+
+class FileSink:
+    '''writes to a file, which can also be a named pipe'''
+    def __init__(self, file_path:str):
+        self.file_path = file_path
+        self.file = None
+
+    def open(self):
+        # opened from the exporter's thread bc opening a named pipe waits until something reads it
+        self.file = open(self.file_path, "wb")
+
+    def write(self, data:bytes):
+        self.file.write(data)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            file, self.file = self.file, None
+            file.close()
+
+class StdoutSink:
+    '''writes to stdout'''
+    def open(self):
+        pass
+
+    def write(self, data:bytes):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    def close(self):
+        pass
+
+class SocketSink:
+    '''connects to something listening on a local TCP port and writes to it'''
+    def __init__(self, host:str, port:int):
+        self.address = (host, port)
+        self.sock = None
+
+    def open(self):
+        self.sock = socket.create_connection(self.address)
+
+    def write(self, data:bytes):
+        self.sock.sendall(data)
+
+    def close(self):
+        if self.sock is not None:
+            sock, self.sock = self.sock, None
+            sock.close()
+
+def make_sink(spec:str):
+    '''
+    makes a sink from a string, which is either "stdout", "file:<file path>",
+    or "socket:<host>:<port>"
+    '''
+    if spec == "stdout":
+        return StdoutSink()
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    if spec.startswith("socket:"):
+        host, port = spec[len("socket:"):].rsplit(":", 1)
+        return SocketSink(host, int(port))
+
+    raise ValueError(f"unknown telemetry sink {spec}")
+
+class Exporter:
+    '''
+    collects records from a World and sends them to a sink from a separate thread
+
+    body states are only recorded every `every` steps, but events are always recorded
+
+    events and body states are kept waiting separately. events are small, so up to
+    queue_len of them can wait, but each body state record has every Body in it, so only
+    the newest max_pending_steps of them are kept and older ones are dropped
+
+    if the sink can't be opened or stops working (ex: nothing is listening on the socket),
+    the error is stored in self.error, records are dropped while it's down, and it gets
+    reopened after a delay that doubles each time it fails, up to MAX_RETRY_DELAY
+    '''
+    MIN_RETRY_DELAY = 0.5
+    MAX_RETRY_DELAY = 8
+
+    def __init__(self, sink, every:int=1, queue_len:int=1024, batch_size:int=64, max_pending_steps:int=2):
+        '''
+        queue_len is how many events can wait for the sink before new ones get dropped,
+        and batch_size is the max num of events written to the sink at once
+        '''
+        if every < 1:
+            raise ValueError("every must be at least 1")
+
+        self.sink = sink
+        self.every = every
+        self.queue_len = queue_len
+        self.batch_size = batch_size
+        self.max_pending_steps = max_pending_steps
+
+        # both of these are only touched while holding self.ready
+        self.events = deque()
+        self.steps = deque()
+        self.unreported = 0 # records dropped that haven't had a "dropped" record sent yet
+        self.stopping = False
+        self.ready = threading.Condition()
+
+        self.dropped = 0 # total records dropped
+        self.error = None # last error from the sink, or None if it hasn't had one
+        self.step_num = 0
+        self.sim_time = 0
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record_event(self, kind:str, **data):
+        '''records something that happened during the current step, unless too many are waiting'''
+        with self.ready:
+            if len(self.events) >= self.queue_len:
+                self.dropped += 1
+                self.unreported += 1
+                return
+
+            self.events.append({"type": kind, "step": self.step_num, **data})
+            self.ready.notify()
+
+    def record_step(self, bodies:list, delta_time:float):
+        '''records the state of Bodies at the end of a step if it's one of every steps'''
+        self.sim_time += delta_time
+
+        if self.step_num % self.every == 0:
+            # only copies the numbers here, converting them to JSON happens in the thread
+            states = [(body.uid, body.mass, body.pos.x, body.pos.y, body.velocity.x, body.velocity.y,
+                       body.status) for body in bodies]
+            record = {"type": "step", "step": self.step_num, "time": self.sim_time, "bodies": states}
+
+            with self.ready:
+                # the newest state is the most useful one, so the oldest waiting one is dropped
+                if len(self.steps) >= self.max_pending_steps:
+                    self.steps.popleft()
+                    self.dropped += 1
+                    self.unreported += 1
+
+                self.steps.append(record)
+                self.ready.notify()
+
+        self.step_num += 1
+
+    def next_batch(self):
+        '''
+        waits for records and returns a batch of them in the order they happened, or
+        None once the exporter is closing and there's nothing left
+        '''
+        with self.ready:
+            while not self.events and not self.steps and not self.stopping:
+                self.ready.wait()
+
+            if not self.events and not self.steps:
+                return None
+
+            batch = [self.events.popleft() for _ in range(min(len(self.events), self.batch_size))]
+
+            # the oldest state only goes in if none of the events still waiting happened during
+            # or before its step, otherwise they'd get written after it in a later batch
+            if self.steps and (not self.events or self.events[0]["step"] > self.steps[0]["step"]):
+                batch.append(self.steps.popleft())
+
+            unreported = self.unreported
+            self.unreported = 0
+
+        # events from a step come before the state at the end of that step
+        batch.sort(key=lambda record: (record["step"], record["type"] == "step"))
+
+        # put in front of everything instead of being sorted bc it's about records that
+        # are already gone, not something that happened at a step
+        if unreported:
+            batch.insert(0, {"type": "dropped", "step": self.step_num, "count": unreported})
+
+        return batch
+
+    def drop(self, num:int):
+        '''counts records that were lost bc the sink wasn't working'''
+        with self.ready:
+            self.dropped += num
+            self.unreported += num
+
+    def close_sink(self):
+        '''closes the sink, ignoring errors bc it's usually being closed bc it broke'''
+        try:
+            self.sink.close()
+        except OSError:
+            pass
+
+    def run(self):
+        '''writes batches of records to the sink until the exporter is closed'''
+        is_open = False
+        retry_delay = self.MIN_RETRY_DELAY
+        next_retry = 0
+
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+
+            if not is_open and time.monotonic() >= next_retry:
+                try:
+                    self.sink.open()
+                    is_open = True
+                    retry_delay = self.MIN_RETRY_DELAY
+                except OSError as error:
+                    self.error = error
+                    print(f"telemetry sink couldn't be opened, retrying in {retry_delay}s: {error}", file=sys.stderr)
+                    next_retry = time.monotonic() + retry_delay
+                    retry_delay = min(retry_delay * 2, self.MAX_RETRY_DELAY)
+
+            if not is_open:
+                self.drop(len(batch))
+                continue
+
+            try:
+                self.sink.write("".join(json.dumps(record) + "\n" for record in batch).encode("utf-8"))
+            except OSError as error:
+                self.error = error
+                print(f"telemetry sink stopped working, reopening it: {error}", file=sys.stderr)
+                self.drop(len(batch))
+                self.close_sink()
+                is_open = False
+
+        if is_open:
+            self.close_sink()
+
+    def close(self, timeout:float=1):
+        '''
+        stops the thread once everything waiting has been written, waiting at most timeout
+        seconds for that so a stuck sink can't hang whatever is closing it
+        '''
+        with self.ready:
+            self.stopping = True
+            self.ready.notify()
+        self.thread.join(timeout)
+
+if __name__ == "__main__":
+    # a stand-in consumer that listens for an Exporter with a SocketSink and prints a
+    # summary of each record, ex: python telemetry.py 5005
+    port = int(sys.argv[1])
+
+    with socket.create_server(("127.0.0.1", port)) as server:
+        conn, _ = server.accept()
+        with conn, conn.makefile("r", encoding="utf-8") as lines:
+            for line in lines:
+                record = json.loads(line)
+                if record["type"] == "step":
+                    print(f"step {record['step']}: {len(record['bodies'])} bodies at t={record['time']:.3f}")
+                else:
+                    print(record)
@@ -53,21 +53,26 @@ class Window:
         if top_bound > MAX_POS_Y:
             self._pan += Vector(0, MAX_POS_Y - top_bound)
 
-    def zoom(self, amt:float, world:"World"): # type: ignore
+    def zoom(self, amt:float):
         '''
         adjusts zoom value
+
+        Bodies remake their surfaces for the new zoom on their own the next time they're drawn
         '''
         # clamp zoom
         self._zoom = max(MIN_ZOOM, min(MAX_ZOOM, self._zoom + amt))
 
-        # change size of surfaces of bodies in world depending on zoom
-        for body in world.bodies:
-            body.update_surf(self.zoom_amt)
-
         # panning by zero still runs the clamping thing and correctly pans the
         # view to make sure the zoom didn't show anything out of simulation bounds
         self.pan(Vector(0, 0))
 
+    def on_screen(self, coords:Vector, margin:float=0) -> bool:
+        '''
+        returns if coordinates in the pygame window are inside the window, with margin
+        being how many px past the edges still count
+        '''
+        return -margin <= coords.x <= self.size.x + margin and -margin <= coords.y <= self.size.y + margin
+
     def window_to_world(self, coords:Vector) -> Vector:
         '''returns coordinates in the simulation world given coordinates in the pygame window'''
         return (coords - self.size/2) / self._zoom + self.pan_amt
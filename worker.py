@@ -0,0 +1,440 @@
+'''
+runs the physics of a World in a separate process so that stepping and displaying
+don't have to take turns, and each one can use its own core
+
+the worker process writes the state of every Body into a double buffered block of shared
+memory after each step, and the pygame side reads whichever frame was finished last straight
+out of that memory. input that changes the physics (adding Bodies, quitting) is sent to the
+worker through a queue, and the worker answers adds through another one
+'''
+from array import array
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import queue
+import sys
+import time
+
+from vector import Vector
+from bodies import Body
+from world import World
+import scenarios
+import telemetry
+
+# columns stored in each frame, all as doubles. status is stored as the ord of its char
+FIELDS = ["uid", "mass", "x", "y", "vx", "vy", "ax", "ay", "status"]
+
+# indexes of the ints at the start of the shared memory that keep track of the 2 frames
+LATEST = 0 # which of the 2 frames was finished most recently
+READING = 1 # which frame the pygame side is reading, or -1 if its not reading one
+FRAME_NUM = 2 # how many frames have been finished in total
+COUNT = 3 # num of Bodies in frame 0, with the num for frame 1 right after
+HEADER_LEN = 8
+HEADER_BYTES = HEADER_LEN * 8
+
+class Frame:
+    '''
+    a finished frame of Body states being read out of a FrameBuffer
+
+    columns maps each of FIELDS to a memoryview of that column in the shared memory, so
+    nothing is copied out of it. the views are only valid until the frame is released
+    '''
+    def __init__(self, frame_num:int, count:int, columns:dict):
+        self.frame_num = frame_num
+        self.count = count
+        self.columns = columns
+
+class FrameBuffer:
+    '''
+    2 frames of Body states in shared memory. the writer always writes to the frame
+    that isn't the latest one and then swaps them, so the reader always has a complete
+    frame to read
+
+    if the reader is still holding the older frame when the writer wants to write over it,
+    the writer just skips that frame instead of waiting, so a slow reader never slows down
+    the writer
+    '''
+    def __init__(self, capacity:int, lock, name:str=None):
+        '''
+        makes the shared memory for capacity Bodies per frame, or connects to already
+        existing shared memory if its name is given
+        '''
+        self.capacity = capacity
+        self.lock = lock
+
+        size = HEADER_BYTES + 2 * len(FIELDS) * capacity * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.header = self.shm.buf[:HEADER_BYTES].cast("q")
+        self.data = self.shm.buf[HEADER_BYTES:size].cast("d")
+
+        if name is None:
+            self.header[LATEST] = 0
+            self.header[READING] = -1
+            self.header[FRAME_NUM] = 0
+            self.header[COUNT] = self.header[COUNT + 1] = 0
+
+        self.frame = None # Frame being read, if there is one
+        self.overflowed = False # if a write has had more Bodies than could fit
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def column_start(self, slot:int, field:str) -> int:
+        '''index in self.data where a column of a frame starts'''
+        return (slot * len(FIELDS) + FIELDS.index(field)) * self.capacity
+
+    def write(self, bodies:list) -> bool:
+        '''
+        writes the states of Bodies into the older frame and makes it the latest one
+
+        only the first self.capacity Bodies fit, which shouldn't happen bc the worker refuses
+        to add Bodies past that, but a warning is printed the first time it does. returns False
+        if the frame was skipped bc the reader is still using it
+        '''
+        with self.lock:
+            slot = 1 - self.header[LATEST]
+            if self.header[READING] == slot:
+                return False
+
+        if len(bodies) > self.capacity and not self.overflowed:
+            self.overflowed = True
+            print(f"warning: only the first {self.capacity} of {len(bodies)} bodies are being shared with the window",
+                  file=sys.stderr)
+
+        # the reader only ever starts reading the latest frame, so this one
+        # can be written without holding the lock
+        bodies = bodies[:self.capacity]
+        count = len(bodies)
+        columns = {
+            "uid": [body.uid for body in bodies],
+            "mass": [body.mass for body in bodies],
+            "x": [body.pos.x for body in bodies],
+            "y": [body.pos.y for body in bodies],
+            "vx": [body.velocity.x for body in bodies],
+            "vy": [body.velocity.y for body in bodies],
+            "ax": [body.accel.x for body in bodies],
+            "ay": [body.accel.y for body in bodies],
+            "status": [ord(body.status) for body in bodies]
+        }
+        for field, values in columns.items():
+            start = self.column_start(slot, field)
+            self.data[start:start + count] = array("d", values)
+
+        with self.lock:
+            self.header[COUNT + slot] = count
+            self.header[FRAME_NUM] += 1
+            self.header[LATEST] = slot
+
+        return True
+
+    def acquire(self) -> Frame:
+        '''
+        starts reading the latest frame and returns it. the writer won't touch it
+        until it's released
+        '''
+        self.release()
+
+        with self.lock:
+            slot = self.header[LATEST]
+            self.header[READING] = slot
+            frame_num = self.header[FRAME_NUM]
+            count = self.header[COUNT + slot]
+
+        columns = {}
+        for field in FIELDS:
+            start = self.column_start(slot, field)
+            columns[field] = self.data[start:start + count]
+
+        self.frame = Frame(frame_num, count, columns)
+        return self.frame
+
+    def release(self):
+        '''stops reading the frame being read, if there is one'''
+        if self.frame is None:
+            return
+
+        for column in self.frame.columns.values():
+            column.release()
+        self.frame = None
+
+        with self.lock:
+            self.header[READING] = -1
+
+    def close(self):
+        '''disconnects from the shared memory'''
+        self.release()
+        self.header.release()
+        self.data.release()
+        self.shm.close()
+
+def run_physics(*args):
+    '''
+    what the worker process runs. runs physics_loop with the same arguments, and if it fails
+    (ex: the scenario file is broken), sends ("error", message) through replies before exiting
+    so the pygame side can tell why
+    '''
+    replies = args[4]
+
+    try:
+        physics_loop(*args)
+    except Exception as error:
+        replies.put(("error", f"{type(error).__name__}: {error}"))
+        raise
+
+def physics_loop(buffer_name:str, capacity:int, lock, commands, replies, samples, physics_fps:int,
+                 scenario_file:str, sample_every:int, history_len:int, telemetry_sink:str,
+                 telemetry_every:int, telemetry_queue_len:int):
+    '''
+    the loop that runs in the worker process. steps a World at up to physics_fps steps
+    per second (0 for unlimited), writing each step into the FrameBuffer and sending
+    new diagnostics samples back if diagnostics are on
+
+    each "add" command gets a reply, either ("added", token, uid, frame_num) with the uid
+    the new Body got and the num of frames finished before it was added, or ("refused", token)
+    if there's no room left for it in the FrameBuffer
+
+    telemetry is exported from here too if telemetry_sink isn't empty, since this is
+    where the World is
+    '''
+    buffer = FrameBuffer(capacity, lock, buffer_name)
+
+    # the buffer has to be closed even if something fails, otherwise it complains about
+    # views of it still existing when the process exits
+    try:
+        world = World()
+        if sample_every > 0:
+            world.enable_diagnostics(sample_every, history_len)
+        if scenario_file:
+            scenarios.load(scenario_file, world)
+        if telemetry_sink:
+            world.enable_export(telemetry.make_sink(telemetry_sink), telemetry_every, telemetry_queue_len)
+
+        min_step_time = 1 / physics_fps if physics_fps > 0 else 0
+        last_time = time.perf_counter()
+        last_sample = None
+        running = True
+
+        while running:
+            # handle all the commands that came in since the last step
+            while True:
+                try:
+                    command = commands.get_nowait()
+                except queue.Empty:
+                    break
+
+                if command[0] == "quit":
+                    running = False
+                elif command[0] == "add":
+                    token, mass, x, y, vx, vy, status, icon = command[1:]
+
+                    # refusing Bodies that don't fit keeps the window showing everything being simulated
+                    if len(world.bodies) >= capacity:
+                        replies.put(("refused", token))
+                        continue
+
+                    body = Body(mass, Vector(x, y), Vector(vx, vy), status)
+                    body.icon = icon # so it looks the same as the one the user placed
+                    world.add_body(body)
+                    replies.put(("added", token, body.uid, buffer.header[FRAME_NUM]))
+
+            # wait for the rest of the step if it was faster than physics_fps allows
+            delta_time = time.perf_counter() - last_time
+            if delta_time < min_step_time:
+                time.sleep(min_step_time - delta_time)
+                delta_time = time.perf_counter() - last_time
+            last_time += delta_time
+
+            world.step(delta_time)
+            buffer.write(world.bodies)
+
+            # the pygame side only ever wants the latest sample and samples only has room for one,
+            # so if it hasn't picked up the last one yet, that one is taken back out first
+            if world.diagnostics is not last_sample:
+                last_sample = world.diagnostics
+                try:
+                    samples.get_nowait()
+                except queue.Empty:
+                    pass
+
+                # the old one can still be on its way into the queue, in which case this one
+                # is skipped and the next sample replaces it
+                try:
+                    samples.put_nowait(last_sample)
+                except queue.Full:
+                    pass
+
+        world.disable_export()
+    finally:
+        buffer.close()
+
+class PhysicsProcess:
+    '''
+    the pygame side of a World running in a worker process
+
+    it has bodies, add_body, diagnostics, and display like a World does, so it can be used in
+    place of one everywhere except stepping, which the worker does by itself. the Bodies in
+    bodies are only used for drawing and get updated from the latest frame every display
+    '''
+    def __init__(self, capacity:int, physics_fps:int, scenario_file:str="", sample_every:int=0,
+                 history_len:int=1000, telemetry_sink:str="", telemetry_every:int=1,
+                 telemetry_queue_len:int=1024):
+        self.lock = mp.Lock()
+        self.buffer = FrameBuffer(capacity, self.lock)
+        self.commands = mp.Queue()
+        self.replies = mp.Queue()
+        self.samples = mp.Queue(maxsize=1)
+
+        self.process = mp.Process(target=run_physics, daemon=True,
+                                  args=(self.buffer.name, capacity, self.lock, self.commands,
+                                        self.replies, self.samples, physics_fps, scenario_file, sample_every,
+                                        history_len, telemetry_sink, telemetry_every,
+                                        telemetry_queue_len))
+
+        self.view = World() # holds the Bodies that are drawn
+        self.view_bodies = {} # the drawn Bodies by the uid of the Body in the worker
+        self.frame_num = 0 # num of the last frame read
+        self.pending = None # Body being placed by the user, kept here until its done
+        self.sent = {} # Bodies sent to the worker that it hasn't replied about yet, by token
+
+        # Bodies the worker added but that haven't shown up in a frame yet, by their uid in
+        # the worker, along with the num of frames the worker had finished before adding them
+        self.added = {}
+        self.diagnostics = None # latest diagnostics Sample from the worker
+
+    @property
+    def bodies(self):
+        return self.view.bodies
+
+    def start(self):
+        '''starts the worker process'''
+        self.process.start()
+
+    def stop(self):
+        '''stops the worker process and frees the shared memory'''
+        self.commands.put(("quit",))
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+        self.buffer.close()
+        self.buffer.shm.unlink()
+
+    def add_body(self, body:Body):
+        '''
+        adds a Body that the user is placing. it stays here while its mass and velocity are
+        being set, since it doesn't affect anything else until then, and gets sent to the
+        worker once it's done
+        '''
+        self.send_pending()
+        self.pending = body
+        self.view.add_body(body)
+
+    def send_pending(self):
+        '''
+        sends the Body being placed to the worker if the user is done setting it
+
+        the Body keeps getting drawn until it shows up in a frame, and then it's used to draw
+        the worker's copy of it, so it keeps its icon and trail
+        '''
+        if self.pending is None or self.pending.status in ["M", "V"]:
+            return
+
+        body = self.pending
+        # this Body's own uid is only used to match up the reply, since the worker gives its
+        # copy a uid that is unique in the worker
+        self.commands.put(("add", body.uid, body.mass, body.pos.x, body.pos.y, body.velocity.x,
+                           body.velocity.y, body.status, body.icon))
+        self.sent[body.uid] = body
+        self.pending = None
+
+    def receive_replies(self):
+        '''
+        handles the worker's replies to Bodies being added
+
+        raises a RuntimeError if the worker has failed, since there's nothing left to display
+        '''
+        while True:
+            try:
+                reply = self.replies.get_nowait()
+            except queue.Empty:
+                break
+
+            if reply[0] == "error":
+                raise RuntimeError(f"physics worker failed: {reply[1]}")
+
+            body = self.sent.pop(reply[1])
+            if reply[0] == "added":
+                self.added[reply[2]] = (body, reply[3])
+            else:
+                print(f"can't add any more bodies, the limit of {self.buffer.capacity} has been reached",
+                      file=sys.stderr)
+                if body in self.view.bodies:
+                    self.view.bodies.remove(body)
+
+    def sync(self):
+        '''updates the drawn Bodies from the latest frame the worker finished'''
+        self.send_pending()
+        self.receive_replies()
+
+        if self.process.exitcode is not None:
+            # the worker sends its error right before it exits, so it might still be on the way
+            try:
+                reply = self.replies.get(timeout=1)
+            except queue.Empty:
+                reply = None
+            if reply is not None and reply[0] == "error":
+                raise RuntimeError(f"physics worker failed: {reply[1]}")
+            raise RuntimeError(f"physics worker stopped unexpectedly with exit code {self.process.exitcode}")
+
+        while True:
+            try:
+                self.diagnostics = self.samples.get_nowait()
+            except queue.Empty:
+                break
+
+        frame = self.buffer.acquire()
+        if frame.frame_num == self.frame_num:
+            self.buffer.release()
+            return
+        self.frame_num = frame.frame_num
+
+        columns = frame.columns
+        uid, mass, x, y = columns["uid"], columns["mass"], columns["x"], columns["y"]
+        vx, vy, ax, ay, status = columns["vx"], columns["vy"], columns["ax"], columns["ay"], columns["status"]
+
+        view_bodies = {}
+        for i in range(frame.count):
+            body = self.view_bodies.get(uid[i])
+            if body is None and uid[i] in self.added:
+                body = self.added.pop(uid[i])[0]
+            if body is None:
+                body = Body(mass[i], Vector(x[i], y[i]))
+
+            body.pos = Vector(x[i], y[i])
+            body.velocity = Vector(vx[i], vy[i])
+            body.accel = Vector(ax[i], ay[i])
+            body.status = chr(int(status[i]))
+            body.trail.update_trail(body.pos.components())
+            view_bodies[uid[i]] = body
+
+        self.buffer.release()
+
+        # added Bodies that should have been in this frame but weren't got removed before
+        # they were ever drawn
+        for added_uid, (body, frame_num) in list(self.added.items()):
+            if self.frame_num > frame_num:
+                del self.added[added_uid]
+
+        # Bodies that aren't in the frame anymore were removed by the worker, and the
+        # ones the worker hasn't gotten to yet keep getting drawn where they are
+        self.view_bodies = view_bodies
+        self.view.bodies = list(view_bodies.values())
+        self.view.add_bodies([body for body, _ in self.added.values()])
+        self.view.add_bodies(list(self.sent.values()))
+        if self.pending is not None:
+            self.view.add_body(self.pending)
+
+    def display(self, screen, background, window, disp_vects:bool):
+        '''displays the latest frame from the worker the same way World.display does'''
+        self.sync()
+        self.view.display(screen, background, window, disp_vects)
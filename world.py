@@ -3,6 +3,8 @@ import pygame as pg
 
 from vector import Vector
 from bodies import Body
+from diagnostics import Monitor
+from telemetry import Exporter
 
 from settings import SETTINGS
 
@@ -24,11 +26,54 @@ class World:
     '''
     def __init__(self):
         self.bodies = []
+        self.monitor = None # conservation diagnostics, off unless enable_diagnostics is used
+        self.exporter = None # telemetry streaming, off unless enable_export is used
+
+    def enable_diagnostics(self, sample_every:int=1, history_len:int=1000) -> Monitor:
+        '''
+        starts recording energy, momentum, and angular momentum every sample_every steps
+
+        returns the Monitor the samples are stored in, which is also self.monitor
+        '''
+        self.monitor = Monitor(sample_every, history_len)
+        return self.monitor
+
+    def disable_diagnostics(self):
+        '''stops recording diagnostics and throws away the recorded ones'''
+        self.monitor = None
+
+    def enable_export(self, sink, every:int=1, queue_len:int=1024, batch_size:int=64,
+                      max_pending_steps:int=2) -> Exporter:
+        '''
+        starts streaming the state of the bodies every `every` steps, along with collisions
+        and removed bodies, to a sink from telemetry.py
+
+        returns the Exporter doing it, which is also self.exporter. its error attribute has
+        the last error from the sink if it has had one
+        '''
+        self.disable_export()
+        self.exporter = Exporter(sink, every, queue_len, batch_size, max_pending_steps)
+        return self.exporter
+
+    def disable_export(self):
+        '''stops streaming telemetry, after trying to write whatever is still queued'''
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
+
+    @property
+    def diagnostics(self):
+        '''most recent diagnostics Sample, or None if there isn't one'''
+        return self.monitor.latest if self.monitor is not None else None
 
     def add_body(self, body:Body):
         '''adds a Body to self.bodies'''
         self.bodies.append(body)
 
+    def add_bodies(self, bodies:list):
+        '''adds a bunch of Bodies to self.bodies at once'''
+        self.bodies.extend(bodies)
+
     def check_collision(self, body1:Body, body2:Body):
         '''returns if there is a collision between 2 active Bodies'''
         return body1.status not in ["M", "V"] and body2.status not in ["M", "V"] and \
@@ -107,23 +152,40 @@ class World:
             not (MIN_POS_Y <= body.pos.y <= MAX_POS_Y):
                 to_remove.append(i)
 
-        for i in to_remove:
+                if self.exporter is not None:
+                    self.exporter.record_event("removed", uid=body.uid, pos=body.pos.components())
+
+        # deletes from the back so deleting a Body doesn't shift the indexes of the rest
+        for i in reversed(to_remove):
             del self.bodies[i]
 
-    def calc_grav_force(self, body1:Body, body2:Body) -> Vector:
+    def calc_grav_force(self, body1:Body, body2:Body) -> tuple:
         '''
         Calculates the gravitational force beween 2 Bodies using newton's formula
+
+        also returns the gravitational potential energy between them, since it comes
+        basically for free once the distance is known. returned as (force, potential)
+
+        inside the threshold there's no force, so the potential stays at what it is right at
+        the threshold instead of going to 0, otherwise the total energy would jump every time
+        2 bodies touch
         '''
-        # return 0 force if body1 or body2 is an inactive Body or if the bodies are really close together
-        # beyond the threshold
-        if body1.status in ["M", "V"] or body2.status in ["M", "V"] or \
-        (body1.pos - body2.pos).magnitude <= (body1.dia + body2.dia) / 2 + GRAV_THRESHOLD: 
-            return Vector(0, 0)
+        # return 0 force if body1 or body2 is an inactive Body
+        if body1.status in ["M", "V"] or body2.status in ["M", "V"]:
+            return Vector(0, 0), 0
 
         # calculates distance vector between the 2 Body to calculate accel
         dist = body2.pos - body1.pos
+        dist_mag = dist.magnitude
+        cutoff = (body1.dia + body2.dia) / 2 + GRAV_THRESHOLD
+
+        grav_mass = GRAV_CONST * body1.mass * body2.mass
+
+        # also 0 force if the bodies are really close together beyond the threshold
+        if dist_mag <= cutoff:
+            return Vector(0, 0), -grav_mass / cutoff
 
-        return Vector(GRAV_CONST * body1.mass * body2.mass / dist.magnitude**2, dist.angle, input_angle=True)
+        return dist * (grav_mass / dist_mag**3), -grav_mass / dist_mag
 
     def step(self, delta_time:float):
         '''
@@ -133,16 +195,29 @@ class World:
 
         also checks for and manages collisions after that, and then removes Bodies
         that went out of bounds
+
+        if diagnostics are enabled, they're recorded from the state at the start of the step,
+        and if telemetry export is enabled, the state at the end of the step is exported
         '''
         for obj in self.bodies:
             obj.accel = Vector(0, 0)
 
+        potential = 0 # total gravitational potential energy, added up for diagnostics
+
         # calculate gravitational acceleration between each pair of Bodies
         for i in range(len(self.bodies) - 1):
             for j in range(i + 1, len(self.bodies)):
-                force = self.calc_grav_force(self.bodies[i], self.bodies[j])
+                force, pair_potential = self.calc_grav_force(self.bodies[i], self.bodies[j])
                 self.bodies[i].accel += force / self.bodies[i].mass
                 self.bodies[j].accel += -force / self.bodies[j].mass
+                potential += pair_potential
+
+        # velocities haven't been changed yet, so kinetic energy and momentum line up
+        # with the positions the potential energy was calculated from
+        if self.monitor is not None:
+            if self.monitor.is_sample_step():
+                self.monitor.record(self.bodies, potential)
+            self.monitor.advance(delta_time)
 
         # once the accels for all Objs are calculated, move them all
         # this is separated from the main loop because moving the objects
@@ -162,9 +237,15 @@ class World:
                     if self.check_collision(self.bodies[i], self.bodies[j]):
                         checking_for_collisions = True
                         self.resolve_collisions(self.bodies[i], self.bodies[j], delta_time)
+
+                        if self.exporter is not None:
+                            self.exporter.record_event("collision", uids=[self.bodies[i].uid, self.bodies[j].uid])
         
         self.remove_far_bodies()
 
+        if self.exporter is not None:
+            self.exporter.record_step(self.bodies, delta_time)
+
     def display(self, screen:pg.surface.Surface, background:pg.surface.Surface, window:"Window", disp_vects:bool): # type: ignore
         '''
         displays everything in the pygame window, including the motion